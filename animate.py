@@ -1,15 +1,21 @@
 import argparse
-import contextlib
 import itertools as it
 import math
 import os
+import queue
 import random
+import threading
 
-from collections import deque
-from functools import singledispatch
+from array import array
+from functools import lru_cache
+from functools import partial
 
-with contextlib.redirect_stdout(open(os.devnull, 'w')):
-    import pygame
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame
+
+# the only events AnimateDemo handles
+_EVENT_TYPES = [pygame.QUIT, pygame.KEYDOWN]
+_QUIT_KEYS = frozenset((pygame.K_ESCAPE, pygame.K_q))
 
 class Animation:
 
@@ -23,6 +29,8 @@ class Animation:
     ):
         self.durations = durations
         self.values = values
+        # values are fixed, pair them once for every start
+        self._pairs = list(nwise(values))
         if lerpfunc is None:
             lerpfunc = lerp
         self.lerpfunc = lerpfunc
@@ -33,26 +41,37 @@ class Animation:
 
     def start(self):
         self.frame = 0
-        pairs = nwise(self.values)
-        pairs = map(list, pairs)
-        self.pairs = self.iterfunc(pairs)
+        self.pairs = self.iterfunc(self._pairs)
         self.running = True
         self.next_pair()
 
     def next_pair(self):
         self.a, self.b = next(self.pairs)
         self.current_duration = next(self.durations)
+        # evaluate every frame up front so that value is only an index
+        if self.lerpfunc is lerp and type(self.a) is tuple:
+            self._trajectory = lerp_trajectory(self.a, self.b, self.current_duration)
+        elif self.lerpfunc is hold:
+            self._trajectory = [self.a] * (self.current_duration + 1)
+        elif hasattr(self.lerpfunc, 'trajectory'):
+            self._trajectory = self.lerpfunc.trajectory(self.a, self.b, self.current_duration)
+        else:
+            step = 1 / self.current_duration
+            self._trajectory = [
+                self.lerpfunc(self.a, self.b, frame * step)
+                for frame in range(self.current_duration + 1)
+            ]
         if hasattr(self, 'next_callback'):
             self.next_callback(self)
 
     def value(self):
-        time = self.frame / self.current_duration
-        return self.lerpfunc(self.a, self.b, time)
+        return self._trajectory[self.frame]
 
     def update(self, advance=1):
         if self.frame < self.current_duration:
-            self.frame += advance
-        elif self.frame >= self.current_duration:
+            # stay within the trajectory
+            self.frame = min(self.frame + advance, self.current_duration)
+        else:
             try:
                 self.next_pair()
             except StopIteration:
@@ -66,6 +85,7 @@ class circlerp:
     def __init__(self, center, radius):
         self.centerx, self.centery = center
         self.radius = radius
+        self.trajectories = {}
 
     def __call__(self, start_angle, end_angle, time):
         angle = lerp(start_angle, end_angle, time)
@@ -73,6 +93,19 @@ class circlerp:
         y = self.centery - math.sin(angle) * self.radius
         return (x, y)
 
+    def trajectory(self, start_angle, end_angle, frames):
+        """
+        Positions for each frame, computed once and reused on repeat.
+        """
+        key = (start_angle, end_angle, frames)
+        if key not in self.trajectories:
+            step = 1 / frames
+            self.trajectories[key] = [
+                self(start_angle, end_angle, frame * step)
+                for frame in range(frames + 1)
+            ]
+        return self.trajectories[key]
+
 
 class wavey_y:
 
@@ -80,6 +113,7 @@ class wavey_y:
         self.radius = radius
         self.centery = centery
         self.waves = waves
+        self.trajectories = {}
 
     def __call__(self, position1, position2, time):
         x1, y1 = position1
@@ -89,6 +123,76 @@ class wavey_y:
         y = self.centery + math.sin(time_to_x * math.tau * self.waves) * self.radius
         return (x, y)
 
+    def trajectory(self, position1, position2, frames):
+        """
+        Positions for each frame, computed once and reused on repeat.
+        """
+        key = (position1, position2, frames)
+        if key not in self.trajectories:
+            x1, y1 = position1
+            x2, y2 = position2
+            step = 1 / frames
+            # the angle advances by a constant delta each frame, so step
+            # sin with the addition formulas instead of calling it per frame
+            delta = math.tau * self.waves * step
+            sin_delta = math.sin(delta)
+            cos_delta = math.cos(delta)
+            sin, cos = 0.0, 1.0
+            positions = []
+            for frame in range(frames + 1):
+                x = lerp(x1, x2, frame * step)
+                y = self.centery + sin * self.radius
+                positions.append((x, y))
+                sin, cos = (
+                    sin * cos_delta + cos * sin_delta,
+                    cos * cos_delta - sin * sin_delta,
+                )
+            self.trajectories[key] = positions
+        return self.trajectories[key]
+
+
+class Trail:
+    """
+    Fixed length queue of points, oldest dropped first, kept in parallel
+    integer arrays so appending does not allocate.
+    """
+
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self.xs = array('i', [0] * maxlen)
+        self.ys = array('i', [0] * maxlen)
+        self.head = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, point):
+        index = (self.head + self.length) % self.maxlen
+        self.xs[index], self.ys[index] = point
+        if self.length < self.maxlen:
+            self.length += 1
+        else:
+            self.head = (self.head + 1) % self.maxlen
+
+    def popleft(self):
+        if not self.length:
+            raise IndexError('pop from an empty trail')
+        point = (self.xs[self.head], self.ys[self.head])
+        self.head = (self.head + 1) % self.maxlen
+        self.length -= 1
+        return point
+
+    def points(self):
+        """
+        List of points, oldest first.
+        """
+        xs, ys, maxlen = self.xs, self.ys, self.maxlen
+        return [
+            (xs[index % maxlen], ys[index % maxlen])
+            for index in range(self.head, self.head + self.length)
+        ]
+
 
 class AnimateDemo:
 
@@ -110,22 +214,36 @@ class AnimateDemo:
         self.debug_actor = debug_actor
         #
         self.frame_counter = it.count()
+        self.draw_counter = it.count()
         self.animation = None
         self.reset()
 
+        if self.frames_path:
+            # encoding images is slow, keep it out of the render loop
+            self.save_queue = queue.Queue(maxsize=4)
+            self.save_error = None
+            self.save_thread = threading.Thread(target=self.save_frames, daemon=True)
+            self.save_thread.start()
+
     def reset(self):
-        self.trail = deque(maxlen=60)
+        self.trail = Trail(maxlen=60)
         self.trail_color1 = pygame.Color('#C33764')
         self.trail_color2 = pygame.Color('#1D2671')
+        self.trail_bands = 8
+        # the trail never grows past maxlen, so its colors can be computed once
+        self.trail_gradient = [
+            lerp(self.trail_color1, self.trail_color2, index / self.trail.maxlen)
+            for index in range(self.trail.maxlen)
+        ]
         #
         self.running = False
 
     def events(self):
-        for event in pygame.event.get():
+        for event in pygame.event.get(eventtype=_EVENT_TYPES):
             if event.type == pygame.QUIT:
                 self.running = False
             elif event.type == pygame.KEYDOWN:
-                if event.key in (pygame.K_ESCAPE, pygame.K_q):
+                if event.key in _QUIT_KEYS:
                     post_quit()
 
     def next_animation(self):
@@ -135,13 +253,14 @@ class AnimateDemo:
             self.animation = None
         else:
             self.animation.start()
+            self.set_animated_attr = partial(setattr, self.rect, self.animation.attr)
 
     def update(self):
         self.actor_animation.update()
 
         if self.animation:
             self.animation.update()
-            setattr(self.rect, self.animation.attr, self.animation.value())
+            self.set_animated_attr(self.animation.value())
             self.trail.append(self.rect.center)
             if not self.animation.running:
                 self.next_animation()
@@ -157,32 +276,63 @@ class AnimateDemo:
 
         ntrail = len(self.trail)
         if ntrail > 1:
-            for index, (p1, p2) in enumerate(nwise(self.trail)):
-                t = invlerp(0, ntrail, index)
-                c = lerp(self.trail_color1, self.trail_color2, t)
-                pygame.draw.line(self.screen, c, p1, p2)
+            # draw runs of segments in a few color bands, one call per band
+            points = self.trail.points()
+            maxlen = self.trail.maxlen
+            nsegments = ntrail - 1
+            for band in range(self.trail_bands):
+                start = band * nsegments // self.trail_bands
+                end = (band + 1) * nsegments // self.trail_bands
+                if start == end:
+                    continue
+                c = self.trail_gradient[start * maxlen // ntrail]
+                pygame.draw.aalines(self.screen, c, False, points[start:end+1])
 
         if self.show_gui:
-            string = f'{self.clock.get_fps():.2f}'
-            fps_text = self.gui_font.render(string, True, (200,)*3)
-            fps_rect = fps_text.get_rect(bottomright = self.gui_frame.bottomright)
-            self.screen.blit(fps_text, fps_rect)
+            # clock.get_fps averages over ten ticks, no use composing more often
+            if next(self.draw_counter) % 10 == 0:
+                string = f'{self.clock.get_fps():.2f}'
+                if string != self.fps_string:
+                    self.fps_string = string
+                    self.fps_text = render_string(self.glyphs, string)
+            fps_rect = self.fps_text.get_rect(bottomright = self.gui_frame.bottomright)
+            self.screen.blit(self.fps_text, fps_rect)
 
             if self.debug_actor:
                 string = (
                     f'{self.actor_animation.frame:03d}'
                     f' / {self.actor_animation.current_duration:03d}'
                 )
-                actor_text = self.huge_font.render(string, True, self.actor_animation.actor_color)
-                actor_rect = actor_text.get_rect(midtop = self.rect.midbottom)
-                self.screen.blit(actor_text, actor_rect)
+                color = self.actor_animation.actor_color
+                glyphs = self.huge_glyphs.get(tuple(color))
+                if glyphs is None:
+                    glyphs = render_glyphs(self.huge_font, color)
+                    self.huge_glyphs[tuple(color)] = glyphs
+                actor_rect = pygame.Rect((0,0), string_size(glyphs, string))
+                actor_rect.midtop = self.rect.midbottom
+                blit_string(self.screen, glyphs, string, actor_rect.topleft)
 
             pygame.display.flip()
 
         if self.frames_path:
+            if self.save_error:
+                raise self.save_error
             filename = self.frames_path % (next(self.frame_counter),)
-            pygame.image.save(self.screen, filename)
-            print(f'saved: {filename}')
+            self.save_queue.put((self.screen.copy(), filename))
+
+    def save_frames(self):
+        # after an error keep draining so put and join never block, the
+        # error is raised from the main thread
+        while True:
+            surf, filename = self.save_queue.get()
+            try:
+                if not self.save_error:
+                    pygame.image.save(surf, filename)
+                    print(f'saved: {filename}')
+            except Exception as error:
+                self.save_error = error
+            finally:
+                self.save_queue.task_done()
 
     def run(self):
         self.running = True
@@ -193,19 +343,26 @@ class AnimateDemo:
             self.update()
             self.draw()
 
-    def start(self, actor_animation, rect, animations):
-        self.actor_animation = actor_animation
-        self.rect = rect
-        self.animations = animations
-
+    def init_screen(self):
+        """
+        Create the screen and background. Images can only be converted to
+        the display's pixel format after this.
+        """
         if not self.show_gui:
             get_screen = pygame.Surface
         else:
-            get_screen = pygame.display.set_mode
+            # SCALED lets SDL use its GPU backed renderer for flips
+            get_screen = partial(
+                pygame.display.set_mode,
+                flags = pygame.SCALED | pygame.DOUBLEBUF,
+                vsync = 1,
+            )
 
         if self.background_path:
             self.background = pygame.image.load(self.background_path)
             self.screen = get_screen(self.background.get_size())
+            # match the screen's pixel format once instead of on every blit
+            self.background = self.background.convert(self.screen)
         else:
             self.screen = get_screen(self.screen_size)
             self.background = self.screen.copy()
@@ -218,6 +375,13 @@ class AnimateDemo:
 
             self.huge_font = pygame.font.Font(None, 80)
 
+            # rendering text with the font every frame is slow, blit cached
+            # glyphs instead
+            self.glyphs = render_glyphs(self.gui_font, (200,)*3)
+            self.huge_glyphs = {}
+            self.fps_string = ''
+            self.fps_text = render_string(self.glyphs, self.fps_string)
+
             help_text = self.gui_font.render('Press Q or Escape to quit', True, (200,)*3)
             help_rect = help_text.get_rect(topright=self.gui_frame.topright)
             self.background.blit(help_text, help_rect)
@@ -227,12 +391,36 @@ class AnimateDemo:
                 help_rect = help_text.get_rect(topright=help_rect.bottomright)
                 self.background.blit(help_text, help_rect)
 
+    def load_actor(self, path):
+        """
+        Load actor image, converted for blitting to the screen when there is
+        a display.
+        """
+        image = pygame.image.load(path)
+        if self.show_gui:
+            image = image.convert_alpha()
+        return image
+
+    def start(self, actor_animation, rect, animations):
+        self.actor_animation = actor_animation
+        self.rect = rect
+        self.animations = animations
+
+        # keep unhandled events, like mouse motion, out of the queue
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(_EVENT_TYPES)
+
         self.clock = pygame.time.Clock()
         self.fps = 60
 
         self.next_animation()
         self.run()
 
+        if self.frames_path:
+            self.save_queue.join()
+            if self.save_error:
+                raise self.save_error
+
 
 def draw_crosshairs(
     surf,
@@ -257,52 +445,95 @@ def draw_crosshairs(
     pygame.draw.line(surf, color, rect_hline[0], rect_hline[1], line_width)
     pygame.draw.line(surf, color, rect_vline[0], rect_vline[1], line_width)
 
-def _lerp(a, b, t):
-    return a * (1 - t) + b * t
+def render_glyphs(font, color, chars='0123456789.:/ '):
+    """
+    Render each character once, for composing strings by blitting.
+    """
+    return {char: font.render(char, True, color).convert_alpha() for char in chars}
 
-@singledispatch
-def lerp(a, b, t):
-    pass
+def string_size(glyphs, string):
+    """
+    Size of string composed from glyphs.
+    """
+    width = sum(glyphs[char].get_width() for char in string)
+    height = max(glyph.get_height() for glyph in glyphs.values())
+    return (width, height)
 
-@lerp.register
-def _(a:int, b:int, t):
-    return _lerp(a, b, t)
+def blit_string(surf, glyphs, string, topleft):
+    """
+    Blit string onto surface glyph by glyph, left to right.
+    """
+    x, y = topleft
+    for char in string:
+        glyph = glyphs[char]
+        surf.blit(glyph, (x, y))
+        x += glyph.get_width()
 
-@lerp.register
-def _(a:float, b:float, t):
-    return _lerp(a, b, t)
+def render_string(glyphs, string):
+    """
+    Compose string from glyphs onto a new surface.
+    """
+    surf = pygame.Surface(string_size(glyphs, string), pygame.SRCALPHA)
+    blit_string(surf, glyphs, string, (0,0))
+    return surf
 
-@lerp.register
-def _(a:tuple, b:tuple, t):
-    return tuple(lerp(item1, item2, t) for item1, item2 in zip(a, b))
+def _lerp(a, b, t):
+    return a * (1 - t) + b * t
 
-@lerp.register
-def _(a:pygame.Color, b:pygame.Color, t):
-    rgba = (lerp(rgba1, rgba2, t) for rgba1, rgba2 in zip(a, b))
-    return pygame.Color(*map(int, rgba))
+def lerp(a, b, t):
+    """
+    Linear interpolation from a to b by t, for numbers, tuples of numbers,
+    colors and surfaces.
+    """
+    # checked inline, in order of how often they are hit, instead of
+    # singledispatch which looks up the type on every call
+    if type(a) is tuple:
+        inv_t = 1 - t
+        return tuple(item1 * inv_t + item2 * t for item1, item2 in zip(a, b))
+    if isinstance(a, pygame.Color):
+        rgba = (_lerp(rgba1, rgba2, t) for rgba1, rgba2 in zip(a, b))
+        return pygame.Color(*map(int, rgba))
+    if isinstance(a, pygame.Surface):
+        if t > .5:
+            return b
+        else:
+            return a
+    return _lerp(a, b, t)
 
-@lerp.register
-def _(a:pygame.Surface, b:pygame.Surface, t):
-    if t > .5:
-        return b
-    else:
-        return a
+@lru_cache
+def lerp_trajectory(a, b, frames):
+    """
+    lerp from a to b for each frame, inclusive. Cached for repeats.
+    """
+    step = 1 / frames
+    if len(a) == 2:
+        # positions, the common case, without a generator per frame
+        (ax, ay), (bx, by) = a, b
+        trajectory = []
+        for frame in range(frames + 1):
+            t = frame * step
+            inv_t = 1 - t
+            trajectory.append((ax * inv_t + bx * t, ay * inv_t + by * t))
+        return tuple(trajectory)
+    return tuple(lerp(a, b, frame * step) for frame in range(frames + 1))
+
+def hold(a, b, t):
+    """
+    Stay at a for the whole time.
+    """
+    return a
 
 def _invlerp(a, b, x):
     return (x - a) / (b - a)
 
-@singledispatch
 def invlerp(a, b, x):
-    pass
-
-@invlerp.register
-def _(a:int, b:int, x):
+    """
+    Inverse of lerp, the time x is at between a and b.
+    """
+    if type(a) is tuple:
+        return tuple(_invlerp(i1, i2, i3) for i1, i2, i3 in zip(a, b, x))
     return _invlerp(a, b, x)
 
-@invlerp.register
-def _(a:tuple, b:tuple, x):
-    return tuple(_invlerp(i1, i2, t) for i1, i2 in zip(a, b))
-
 def get_rect(rect, **kwargs):
     rect = rect.copy()
     for k, v in kwargs.items():
@@ -313,6 +544,9 @@ def nwise(iterable, n=2):
     """
     Take iterable in overlapping n-wise fashion, defaulting to 2-pairs.
     """
+    # pairwise is new in Python 3.10
+    if n == 2 and hasattr(it, 'pairwise'):
+        return it.pairwise(iterable)
     pairs = it.tee(iterable, n)
     for index, pair in enumerate(pairs):
         for _ in range(index):
@@ -398,14 +632,15 @@ def main(args):
     pygame.display.init()
     pygame.font.init()
 
-    if args.background:
-        bg = pygame.image.load(args.background)
-        window_size = bg.get_size()
-        # TODO: close this file?
-    else:
-        window_size = args.size
-
-    window = pygame.Rect((0,0), window_size)
+    demo = AnimateDemo(
+        screen_size = args.size,
+        frames_path = args.output,
+        no_gui = args.no_gui,
+        repeat = args.repeat,
+        background = args.background,
+    )
+    demo.init_screen()
+    window = demo.window
 
     actor_colors = it.cycle([
         pygame.Color('red'),
@@ -415,10 +650,7 @@ def main(args):
     def actor_color_callback(animation):
         animation.actor_color = next(actor_colors)
 
-    def hold(a, b, t):
-        return a
-
-    surfaces = list(map(pygame.image.load, args.actor))
+    surfaces = list(map(demo.load_actor, args.actor))
     actor_animation = Animation(
         it.cycle([
             30, # 0 -> 1, open eyes
@@ -437,13 +669,6 @@ def main(args):
     rect.center = window.center
     animations = build_animations(rect, window, repeat=args.repeat)
 
-    demo = AnimateDemo(
-        screen_size = window.size,
-        frames_path = args.output,
-        no_gui = args.no_gui,
-        repeat = args.repeat,
-        background = args.background,
-    )
     demo.start(actor_animation, rect, animations)
 
 def sizetype(string):